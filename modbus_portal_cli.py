@@ -6,36 +6,47 @@ modbus_portal_cli.py
 """
 
 from __future__ import annotations
-from typing import Dict, Any, Tuple, List
+from typing import Dict, Any, Callable, Iterator, Tuple, List, NamedTuple
+import functools
 import math
-import re
+import socket
 import struct
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
+import numpy as np
 from pymodbus.client import ModbusTcpClient  # works with pymodbus 3.x (and most 2.x)
+from pymodbus.exceptions import ModbusException
 
 # ----------------------------
 # Host:Port parsing
 # ----------------------------
 
-_HOSTPORT_RE = re.compile(
-    r"""
-    ^\s*
-    (?:\[(?P<ipv6>[^]]+)\]|(?P<host>[^:\s]+))   # [IPv6] or hostname/IPv4
-    (?::(?P<port>\d{1,5}))?                     # optional :port
-    \s*$
-    """,
-    re.X,
-)
+def _is_port(text: str) -> bool:
+    return 0 < len(text) <= 5 and text.isascii() and text.isdigit()
 
+@functools.lru_cache(maxsize=1024)
 def parse_host_port(ip_text: str, default_port: int = 502) -> Tuple[str, int]:
+    # Plain string scanning: '[IPv6]', '[IPv6]:port', 'host' or 'host:port'.
+    # Anything else (e.g. a bare IPv6 literal) is returned stripped with the default port.
     if not ip_text:
         return "", default_port
-    m = _HOSTPORT_RE.match(ip_text)
-    if not m:
-        return ip_text.strip(), default_port
-    host = (m.group("ipv6") or m.group("host") or "").strip()
-    port = int(m.group("port")) if m.group("port") else default_port
-    return host, port
+    text = ip_text.strip()
+    if text.startswith("["):
+        end = text.find("]")
+        if end > 1:
+            host, tail = text[1:end].strip(), text[end + 1:]
+            if not tail:
+                return host, default_port
+            if tail[0] == ":" and _is_port(tail[1:]):
+                return host, int(tail[1:])
+        return text, default_port
+    head, sep, tail = text.rpartition(":")
+    if sep and head and ":" not in head and _is_port(tail):
+        return head, int(tail)
+    return text, default_port
 
 
 # ----------------------------
@@ -49,99 +60,122 @@ def parse_host_port(ip_text: str, default_port: int = 502) -> Tuple[str, int]:
 #   BADC: reg0 = [B A], reg1 = [D C]        (byte swap in each word)
 #   DCBA: reg0 = [D C], reg1 = [B A]        (byte swap + word swap)
 
-def _reg_from_bytes(b0: int, b1: int) -> int:
-    return ((b0 & 0xFF) << 8) | (b1 & 0xFF)
+# code -> (byte swap within each word, word swap)
+_ENDIAN_MAP = {
+    "ABCD": (False, False),
+    "CDAB": (False, True),
+    "BADC": (True, False),
+    "DCBA": (True, True),
+}
 
-def _bytes_from_reg(reg: int) -> Tuple[int, int]:
-    return ((reg >> 8) & 0xFF, reg & 0xFF)
+def _endian_flags(order: str) -> Tuple[bool, bool]:
+    # Normalized rows already carry an upper-case order; only other spellings pay for upper()
+    flags = _ENDIAN_MAP.get(order)
+    if flags is None:
+        flags = _ENDIAN_MAP.get((order or "ABCD").upper(), (False, False))
+    return flags
 
+_I32_BE = struct.Struct(">i")
+_F32_BE = struct.Struct(">f")
+_U16X2_BE = struct.Struct(">HH")
+_U16X2_LE = struct.Struct("<HH")
+
+def _regs_from_abcd(abcd: bytes, order: str) -> List[int]:
+    # Read canonical ABCD bytes as two 16-bit words ('<HH' swaps bytes within each word)
+    byte_swap, word_swap = _endian_flags(order)
+    hi, lo = (_U16X2_LE if byte_swap else _U16X2_BE).unpack(abcd)
+    return [lo, hi] if word_swap else [hi, lo]
+
+@functools.lru_cache(maxsize=1024)
+def _pack_i32(v: int, order: str) -> Tuple[int, ...]:
+    if (order == "ABCD" or not order) and -0x80000000 <= v <= 0x7FFFFFFF:
+        # Default order: plain shifts, no bytes round-trip
+        v &= 0xFFFFFFFF
+        return v >> 16, v & 0xFFFF
+    return tuple(_regs_from_abcd(_I32_BE.pack(v), order))
+
+@functools.lru_cache(maxsize=1024)
+def _pack_f32(v: float, order: str) -> Tuple[int, ...]:
+    if order == "ABCD" or not order:
+        return _U16X2_BE.unpack(_F32_BE.pack(v))
+    return tuple(_regs_from_abcd(_F32_BE.pack(v), order))
+
+# Writes tend to repeat the same few setpoints, so packed words are memoized
+# (as tuples; callers get a fresh list).
 def pack_i32_to_regs(value: int, order: str) -> List[int]:
-    # Build ABCD bytes using big-endian pack, then permute into two registers
-    abcd = struct.pack(">i", int(value))
-    A, B, C, D = abcd[0], abcd[1], abcd[2], abcd[3]
-    o = (order or "ABCD").upper()
-    if o == "ABCD":
-        return [_reg_from_bytes(A,B), _reg_from_bytes(C,D)]
-    if o == "CDAB":
-        return [_reg_from_bytes(C,D), _reg_from_bytes(A,B)]
-    if o == "BADC":
-        return [_reg_from_bytes(B,A), _reg_from_bytes(D,C)]
-    if o == "DCBA":
-        return [_reg_from_bytes(D,C), _reg_from_bytes(B,A)]
-    # default
-    return [_reg_from_bytes(A,B), _reg_from_bytes(C,D)]
+    return list(_pack_i32(int(value), order))
 
 def pack_f32_to_regs(value: float, order: str) -> List[int]:
-    abcd = struct.pack(">f", float(value))
-    A, B, C, D = abcd[0], abcd[1], abcd[2], abcd[3]
-    o = (order or "ABCD").upper()
-    if o == "ABCD":
-        return [_reg_from_bytes(A,B), _reg_from_bytes(C,D)]
-    if o == "CDAB":
-        return [_reg_from_bytes(C,D), _reg_from_bytes(A,B)]
-    if o == "BADC":
-        return [_reg_from_bytes(B,A), _reg_from_bytes(D,C)]
-    if o == "DCBA":
-        return [_reg_from_bytes(D,C), _reg_from_bytes(B,A)]
-    return [_reg_from_bytes(A,B), _reg_from_bytes(C,D)]
+    v = float(value)
+    if v and v == v:
+        return list(_pack_f32(v, order))
+    # 0.0/-0.0 share a cache key and NaN never hits it
+    return list(_pack_f32.__wrapped__(v, order))
+
+def _abcd_from_regs(r0: int, r1: int, order: str) -> bytes:
+    # Inverse of _regs_from_abcd: undo the word swap, then pack with the matching byte order
+    byte_swap, word_swap = _endian_flags(order)
+    if word_swap:
+        r0, r1 = r1, r0
+    return (_U16X2_LE if byte_swap else _U16X2_BE).pack(int(r0) & 0xFFFF, int(r1) & 0xFFFF)
 
 def unpack_i32_from_regs(regs: List[int], order: str) -> int | None:
     if len(regs) < 2:
         return None
-    r0, r1 = int(regs[0]), int(regs[1])
-    a0, a1 = _bytes_from_reg(r0)
-    b0, b1 = _bytes_from_reg(r1)
-    o = (order or "ABCD").upper()
-    # Reconstruct ABCD in canonical order
-    if o == "ABCD":
-        A, B, C, D = a0, a1, b0, b1
-    elif o == "CDAB":
-        A, B, C, D = b0, b1, a0, a1
-    elif o == "BADC":
-        A, B, C, D = a1, a0, b1, b0
-    elif o == "DCBA":
-        A, B, C, D = b1, b0, a1, a0
-    else:
-        A, B, C, D = a0, a1, b0, b1
-    return struct.unpack(">i", bytes([A,B,C,D]))[0]
+    if order == "ABCD" or not order:
+        x = ((int(regs[0]) & 0xFFFF) << 16) | (int(regs[1]) & 0xFFFF)
+        return (x ^ 0x80000000) - 0x80000000
+    return _I32_BE.unpack(_abcd_from_regs(regs[0], regs[1], order))[0]
 
 def unpack_f32_from_regs(regs: List[int], order: str) -> float | None:
     if len(regs) < 2:
         return None
-    r0, r1 = int(regs[0]), int(regs[1])
-    a0, a1 = _bytes_from_reg(r0)
-    b0, b1 = _bytes_from_reg(r1)
-    o = (order or "ABCD").upper()
-    if o == "ABCD":
-        A, B, C, D = a0, a1, b0, b1
-    elif o == "CDAB":
-        A, B, C, D = b0, b1, a0, a1
-    elif o == "BADC":
-        A, B, C, D = a1, a0, b1, b0
-    elif o == "DCBA":
-        A, B, C, D = b1, b0, a1, a0
-    else:
-        A, B, C, D = a0, a1, b0, b1
-    return struct.unpack(">f", bytes([A,B,C,D]))[0]
+    return _F32_BE.unpack(_abcd_from_regs(regs[0], regs[1], order))[0]
 
 
 # ----------------------------
 # Encode / Decode for portal
 # ----------------------------
 
+# ',' and ';' become spaces, so str.split() handles every separator (and drops empties)
+_DELIM_TRANS = str.maketrans({",": " ", ";": " "})
+
+def _split_values(text: str) -> List[str]:
+    return text.translate(_DELIM_TRANS).split()
+
+_TRUE_SET = frozenset(("1", "true", "on", "yes"))
+
+_FALSE_SET = frozenset(("0", "false", "off", "no"))
+
 def _to_num(token: str) -> float:
-    t = (token or "").strip().lower()
-    if t in ("true", "on", "yes"):
-        return 1.0
-    if t in ("false", "off", "no"):
-        return 0.0
-    return float(token)
+    # Numbers are the common case; only words pay for the lower() and set lookups
+    try:
+        return float(token)
+    except ValueError:
+        t = token.strip().lower()
+        if t in _TRUE_SET:
+            return 1.0
+        if t in _FALSE_SET:
+            return 0.0
+        raise
+
+# Below this many registers the plain-Python loops beat NumPy's array setup cost.
+_NP_MIN_REGS = 16
 
-def _apply_scale_write(v: float, scale: float) -> float:
-    return v / scale if (scale not in (None, 0, 1) and not math.isclose(scale, 1.0)) else v
+def _effective_scale(scale: float) -> float | None:
+    # None when scaling is a no-op (missing, 0 or 1), so callers can test it once per call
+    return None if (scale in (None, 0, 1) or math.isclose(scale, 1.0)) else scale
 
-def _apply_scale_read(v: float, scale: float) -> float:
-    return v * scale if (scale not in (None, 0, 1) and not math.isclose(scale, 1.0)) else v
+def _pack32_many(values: List[Any], code: str, order: str) -> List[int]:
+    # Several 32-bit values: one pack into a single buffer and one unpack into words,
+    # instead of a bytes object per value. 'code' is the struct code ('i' or 'f').
+    byte_swap, word_swap = _endian_flags(order)
+    n = len(values)
+    raw = struct.pack(f">{n}{code}", *values)
+    regs = list(struct.unpack(f"{'<' if byte_swap else '>'}{2 * n}H", raw))
+    if word_swap:
+        regs[0::2], regs[1::2] = regs[1::2], regs[0::2]
+    return regs
 
 def build_registers(value_text: str, datatype: str, endianness: str, scale: float = 1.0) -> List[int]:
     """
@@ -152,35 +186,94 @@ def build_registers(value_text: str, datatype: str, endianness: str, scale: floa
     if value_text is None:
         value_text = ""
     value_text = value_text.strip()
-    parts = [p for p in re.split(r"[,\s;]+", value_text) if p != ""]
+    parts = _split_values(value_text)
     dt = (datatype or "int16").lower()
+    eff = _effective_scale(scale)
     out: List[int] = []
 
-    if dt in ("int16", "uint16"):
-        for p in (parts or ["0"]):
-            v = int(round(_apply_scale_write(_to_num(p), scale)))
-            if dt == "uint16":
-                v &= 0xFFFF
-            out.append(v & 0xFFFF)
+    if dt == "float32":
+        vals = [_to_num(p) for p in (parts or ["0"])]
+        if eff:
+            vals = [x / eff for x in vals]
+        if len(vals) == 1:
+            return pack_f32_to_regs(vals[0], endianness)
+        out = _pack32_many(vals, "f", endianness)
 
     elif dt == "int32":
-        for p in (parts or ["0"]):
-            v = int(round(_apply_scale_write(_to_num(p), scale)))
-            out.extend(pack_i32_to_regs(v, endianness))
+        vals = [_to_num(p) for p in (parts or ["0"])]
+        vals = [int(round(x / eff if eff else x)) for x in vals]
+        if len(vals) == 1:
+            return pack_i32_to_regs(vals[0], endianness)
+        out = _pack32_many(vals, "i", endianness)
 
-    elif dt == "float32":
-        for p in (parts or ["0"]):
-            v = _apply_scale_write(_to_num(p), scale)
-            out.extend(pack_f32_to_regs(float(v), endianness))
+    elif len(parts) >= _NP_MIN_REGS:
+        # Long int16/uint16 lists: scale, round (half-to-even, like round()) and mask in one pass
+        arr = np.array([_to_num(p) for p in parts], dtype=np.float64)
+        if eff:
+            arr /= eff
+        if np.isfinite(arr).all() and np.abs(arr).max() < 2 ** 62:
+            return (np.rint(arr).astype(np.int64) & 0xFFFF).tolist()
+        out = [int(round(x)) & 0xFFFF for x in arr.tolist()]
 
     else:
-        # default to uint16
+        # int16 / uint16 (and unknown types, treated as uint16): low 16 bits
         for p in (parts or ["0"]):
-            v = int(round(_apply_scale_write(_to_num(p), scale)))
-            out.append(v & 0xFFFF)
+            x = _to_num(p)
+            out.append(int(round(x / eff if eff else x)) & 0xFFFF)
 
     return out
 
+def _decode_np(registers, dt: str, endianness: str, scale: float | None) -> np.ndarray:
+    # 'scale' is already reduced by _effective_scale (None = no scaling)
+    arr = np.asarray(registers, dtype=np.uint16)
+    if dt == "int16":
+        vals = arr.view(np.int16)
+    elif dt in ("int32", "float32"):
+        byte_swap, word_swap = _endian_flags(endianness)
+        words = arr[: len(arr) // 2 * 2].reshape(-1, 2)
+        if word_swap:
+            words = words[:, ::-1]
+        # Lay the words out as ABCD bytes (little-endian words undo a byte swap) and reinterpret
+        abcd = np.ascontiguousarray(words, dtype="<u2" if byte_swap else ">u2")
+        vals = abcd.view(">i4" if dt == "int32" else ">f4").ravel()
+    else:
+        vals = arr
+    if scale:
+        # Widen before scaling so int scales don't wrap and float32 isn't kept; float
+        # values (NaN included) are only ever widened to float64, never cast to int
+        wide = np.int64 if isinstance(scale, int) and vals.dtype.kind in "iu" else np.float64
+        with np.errstate(invalid="ignore"):
+            vals = vals.astype(wide) * scale
+    return vals
+
+def decode_registers_bulk(registers, datatype: str, endianness: str, scale: float = 1.0) -> np.ndarray:
+    """
+    Vectorized decode for large reads: same rules as decode_registers(), but
+    returns a 1-D NumPy array (even for a single value).
+    - datatype: int16, uint16, int32, float32 (anything else decodes as uint16)
+    - 'registers' may be a list or a uint16 array; int32/float32 ignore a trailing odd register.
+    """
+    return _decode_np(registers, (datatype or "int16").lower(), endianness, _effective_scale(scale))
+
+def _make_decoder32(code: str, byte_swap: bool, word_swap: bool):
+    # Specialized decoder for one (type, order): pack all registers with one byte order
+    # and unpack all values with another. Bytes in each word are flipped iff exactly one
+    # swap applies; reading the values little-endian undoes a word swap.
+    words = f"{'<' if byte_swap != word_swap else '>'}{{}}H"
+    values = f"{'<' if word_swap else '>'}{{}}{code}"
+
+    def decode(regs: List[int]) -> List[Any]:
+        n = len(regs) // 2
+        return list(struct.unpack(values.format(n), struct.pack(words.format(2 * n), *regs[:2 * n])))
+    return decode
+
+# (datatype, order) -> decoder for the short-read path, built once at import
+_DECODERS = {
+    (dt, order): _make_decoder32(code, byte_swap, word_swap)
+    for dt, code in (("int32", "i"), ("float32", "f"))
+    for order, (byte_swap, word_swap) in _ENDIAN_MAP.items()
+}
+
 def decode_registers(registers: List[int], datatype: str, endianness: str, scale: float = 1.0):
     """
     Convert register list to a value using datatype and endianness.
@@ -189,32 +282,22 @@ def decode_registers(registers: List[int], datatype: str, endianness: str, scale
     if not registers:
         return None
     dt = (datatype or "int16").lower()
+    eff = _effective_scale(scale)  # decided once, not per value
+    if len(registers) >= _NP_MIN_REGS and dt in ("int16", "uint16", "int32", "float32"):
+        vals = _decode_np(registers, dt, endianness, eff).tolist()
+        return vals[0] if len(vals) == 1 else vals
     if dt == "int16":
-        vals = [_apply_scale_read((r if r < 0x8000 else r - 0x10000), scale) for r in registers]
-    elif dt == "uint16":
-        vals = [_apply_scale_read(int(r & 0xFFFF), scale) for r in registers]
-    elif dt == "int32":
-        vals = []
-        for i in range(0, len(registers), 2):
-            chunk = registers[i:i+2]
-            if len(chunk) < 2:
-                break
-            v = unpack_i32_from_regs(chunk, endianness)
-            if v is None:
-                continue
-            vals.append(_apply_scale_read(v, scale))
-    elif dt == "float32":
-        vals = []
-        for i in range(0, len(registers), 2):
-            chunk = registers[i:i+2]
-            if len(chunk) < 2:
-                break
-            v = unpack_f32_from_regs(chunk, endianness)
-            if v is None:
-                continue
-            vals.append(_apply_scale_read(v, scale))
+        vals = [(r ^ 0x8000) - 0x8000 for r in registers]
+    elif dt in ("int32", "float32"):
+        decode = _DECODERS.get((dt, endianness))
+        if decode is None:  # not normalized, or unknown (treated as ABCD)
+            decode = _DECODERS.get((dt, (endianness or "ABCD").upper()), _DECODERS[(dt, "ABCD")])
+        vals = decode(registers)
     else:
-        vals = [_apply_scale_read(int(r & 0xFFFF), scale) for r in registers]
+        # uint16 (and unknown types)
+        vals = [r & 0xFFFF for r in registers]
+    if eff:
+        vals = [v * eff for v in vals]
     return vals[0] if len(vals) == 1 else vals
 
 
@@ -222,230 +305,795 @@ def decode_registers(registers: List[int], datatype: str, endianness: str, scale
 # Core executor
 # ----------------------------
 
+# Every key perform_row()/perform_rows() may put in a result dict, in the order they appear
+RESULT_KEYS = ("ok", "value", "registers", "error")
+
+# Failures reported per row instead of aborting the run: transport/protocol
+# errors, bad values in the mapping, and client API mismatches.
+_ROW_ERRORS = (ModbusException, OSError, ValueError, OverflowError, TypeError, struct.error)
+
+def _client_for(clients: Dict[Tuple[str, int, float], ModbusTcpClient],
+                host: str, port: int, timeout: float) -> ModbusTcpClient:
+    key = (host, port, float(timeout))
+    client = clients.get(key)
+    if client is None:
+        client = ModbusTcpClient(host=host, port=port, timeout=timeout)
+        clients[key] = client
+    return client
+
+def _connect(client: ModbusTcpClient) -> bool:
+    # Connect if needed; a fresh socket gets TCP_NODELAY (Modbus PDUs are tiny, so
+    # Nagle only adds delay) and SO_KEEPALIVE (cached clients may sit idle)
+    if getattr(client, "socket", None) is not None:
+        return True
+    if not client.connect():
+        return False
+    try:
+        client.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        client.socket.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+    except (AttributeError, OSError):
+        pass
+    return True
+
+# Function handlers. Each fills the device-independent parts of `result` and returns
+# the request to send as (client method, positional args, store), or None when there
+# is nothing to send (dry-run writes). store(response, result) records the outcome.
+# The sync and async runners share them and differ only in how they call the client.
+# Signature: (row, result, dry)
+
+_Request = Tuple[str, Tuple[Any, ...], Callable[[Any, Dict[str, Any]], None]]
+
+def _store_bits(rr, result: Dict[str, Any], count: int) -> None:
+    if rr.isError():
+        result["error"] = str(rr)
+    else:
+        bits = rr.bits[:count]
+        result["ok"] = True
+        result["value"] = bits[0] if len(bits) == 1 else bits
+
+def _store_registers(rr, result: Dict[str, Any], count: int, dtype: str, end: str, scale: float) -> None:
+    if rr.isError():
+        result["error"] = str(rr)
+    else:
+        regs = (rr.registers or [])[:count]
+        val = decode_registers(regs, dtype, end, scale)
+        result["ok"] = True
+        result["value"] = val
+        result["registers"] = regs
+
+def _store_write(wr, result: Dict[str, Any], fields: Dict[str, Any]) -> None:
+    result["ok"] = not wr.isError()
+    if wr.isError():
+        result["error"] = str(wr)
+    result.update(fields)
+
+def _write_request(result: Dict[str, Any], dry: bool, method: str, args: Tuple[Any, ...],
+                   **fields: Any) -> _Request | None:
+    # 'fields' (value/registers) are reported after ok/error; dry runs send nothing
+    if dry:
+        result["ok"] = True
+        result.update(fields)
+        return None
+    return method, args, functools.partial(_store_write, fields=fields)
+
+def _bits_request(method: str, row: Dict[str, Any]) -> _Request:
+    addr, count = row["address"], row["count"]
+    return method, (addr, count), functools.partial(_store_bits, count=count)
+
+def _registers_request(method: str, row: Dict[str, Any]) -> _Request:
+    addr, count = row["address"], row["count"]
+    return method, (addr, count), functools.partial(
+        _store_registers, count=count, dtype=row["datatype"], end=row["endianness"], scale=row["scale"])
+
+# ----------- COILS -----------
+def _read_coils(row, result, dry):
+    return _bits_request("read_coils", row)
+
+def _coil_bit(value_text: str) -> bool:
+    return str(value_text).strip().lower() in _TRUE_SET
+
+def _coil_bits(value_text: str) -> List[bool]:
+    return [p.lower() in _TRUE_SET for p in _split_values(str(value_text))] or [False]
+
+def _write_coil(row, result, dry):
+    bit = _coil_bit(row["value"])
+    return _write_request(result, dry, "write_coil", (row["address"], bit), value=bit)
+
+def _write_coils(row, result, dry):
+    bits = _coil_bits(row["value"])
+    return _write_request(result, dry, "write_coils", (row["address"], bits), value=bits)
+
+# -------- DISCRETE INPUTS --------
+def _read_discrete(row, result, dry):
+    return _bits_request("read_discrete_inputs", row)
+
+# -------- HOLDING REGISTERS --------
+def _read_holding(row, result, dry):
+    return _registers_request("read_holding_registers", row)
+
+def _write_register(row, result, dry):
+    regs = build_registers(row["value"], row["datatype"], row["endianness"], row["scale"]) or [0]
+    return _write_request(result, dry, "write_register", (row["address"], regs[0] & 0xFFFF),
+                          registers=regs[:1], value=row["value"])
+
+def _write_registers(row, result, dry):
+    regs = build_registers(row["value"], row["datatype"], row["endianness"], row["scale"]) or [0]
+    return _write_request(result, dry, "write_registers", (row["address"], regs),
+                          registers=regs, value=row["value"])
+
+# -------- INPUT REGISTERS --------
+def _read_input(row, result, dry):
+    return _registers_request("read_input_registers", row)
+
+_FN_HANDLERS = {
+    "read_coils": _read_coils,
+    "write_coil": _write_coil,
+    "write_coils": _write_coils,
+    "read_discrete": _read_discrete,
+    "read_holding": _read_holding,
+    "write_register": _write_register,
+    "write_registers": _write_registers,
+    "read_input": _read_input,
+}
+
+# Accepted spellings of each function (lowercased, spaces as '_') -> canonical handler name
+_FN_ALIASES = {
+    alias: canon
+    for canon, aliases in {
+        "read_coils": ("read_coils", "read_coil"),
+        "write_coil": ("write_single", "write_single_coil", "write_coil"),
+        "write_coils": ("write_multi", "write_multiple_coils", "write_coils"),
+        "read_discrete": ("read_discrete", "read_discrete_inputs", "read_di", "read_discrete_input"),
+        "read_holding": ("read_holding", "read_holding_registers", "read_hr"),
+        "write_register": ("write_single_register", "write_single_reg", "write_register"),
+        "write_registers": ("write_multi_registers", "write_multiple_registers", "write_regs"),
+        "read_input": ("read_input", "read_input_registers", "read_ir"),
+    }.items()
+    for alias in aliases
+}
+
+@functools.lru_cache(maxsize=256)
+def _canonical_fn(fn: str) -> str:
+    # 'read hr' and 'read_hr' are the same function
+    return _FN_ALIASES.get(fn.replace(" ", "_"), "")
+
+class _TypedRow(dict):
+    """A mapping row whose fields were already coerced by normalize_row()."""
+    # Derived once per row; kept off the dict so printed/returned rows are unchanged
+    __slots__ = ("host", "port", "fn")
+
+# Code fields (function, datatype, rw, endianness) repeat a handful of spellings
+# across a mapping, so their normalized + interned forms are memoized.
+@functools.lru_cache(maxsize=256)
+def _fn_code(text: str) -> str:
+    return sys.intern(text.strip().lower())
+
+@functools.lru_cache(maxsize=256)
+def _lower_code(text: str) -> str:
+    return sys.intern(text.lower())
+
+@functools.lru_cache(maxsize=256)
+def _upper_code(text: str) -> str:
+    return sys.intern(text.upper())
+
+def normalize_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Return a copy of 'row' with the executor fields coerced to their working types:
+      ip: str (stripped), unit_id/address: int, count: int >= 1, function: lowercase str,
+      datatype: lowercase str, rw/endianness: uppercase str, scale: float, value: str.
+    The short code strings are interned, so a large mapping holds one copy of each.
+    Other keys are kept as-is. The parsed (host, port) and canonical function name
+    are cached as attributes, so perform_row() does no per-call coercion on these rows.
+    Raises ValueError/TypeError on non-numeric unit_id/address/count/scale.
+    """
+    out = _TypedRow(row)
+    out["ip"] = str(row.get("ip", "")).strip()
+    out["unit_id"] = int(row.get("unit_id", 1) or 1)
+    out["function"] = _fn_code(str(row.get("function", "")))
+    out["address"] = int(row.get("address", 0) or 0)
+    out["count"] = max(int(row.get("count", 1) or 1), 1)
+    out["datatype"] = _lower_code(str(row.get("datatype", "int16")))
+    out["rw"] = _upper_code(str(row.get("rw", "R")))
+    out["endianness"] = _upper_code(str(row.get("endianness", "ABCD")))
+    out["scale"] = float(row.get("scale", 1.0) or 1.0)
+    out["value"] = "" if row.get("value") is None else str(row.get("value"))
+    out.host, out.port = parse_host_port(out["ip"] or "127.0.0.1", default_port=502)
+    out.fn = _canonical_fn(out["function"])
+    return out
+
+def _row_handler(row: Dict[str, Any], result: Dict[str, Any]):
+    # (normalized row, handler); the handler is None, and 'result' holds the error,
+    # for an unsupported function
+    if type(row) is not _TypedRow:
+        row = normalize_row(row)
+    handler = _FN_HANDLERS.get(row.fn)
+    if handler is None:
+        result["error"] = f"unsupported function: {row['function']}"
+    return row, handler
+
+def _connect_error(row: Dict[str, Any]) -> str:
+    return f"connect failed: {row.host}:{row.port}"
+
+def _exc_error(exc: BaseException) -> str:
+    return f"{type(exc).__name__}: {exc}"
+
 def perform_row(row: Dict[str, Any], clients: Dict[Tuple[str, int, float], ModbusTcpClient],
                 timeout: float = 3.0, dry: bool = False) -> Dict[str, Any]:
     """
     Execute a single mapping row.
     Expected keys:
       ip (host or host:port), unit_id, function, address, count, datatype, rw, scale, endianness, value
+    Rows from normalize_row() are used as-is; anything else is normalized first.
     'clients' is a cache dict keyed by (host, port, timeout).
     Returns: dict with fields like ok, error, value, registers, etc.
     """
     result: Dict[str, Any] = {"ok": False}
+    row, handler = _row_handler(row, result)
+    if handler is None:
+        return result
+
+    client = _client_for(clients, row.host, row.port, timeout)
+    if not _connect(client):
+        result["error"] = _connect_error(row)
+        return result
+
+    try:
+        request = handler(row, result, dry)
+        if request is not None:
+            method, args, store = request
+            store(getattr(client, method)(*args, unit=row["unit_id"]), result)
+    except _ROW_ERRORS as exc:
+        result["error"] = _exc_error(exc)
 
-    raw_ip = str(row.get("ip", "")).strip()
-    host, port = parse_host_port(raw_ip or "127.0.0.1", default_port=502)
+    return result
 
-    unit = int(row.get("unit_id", 1) or 1)
-    fn = str(row.get("function", "")).strip().lower()
-    addr = int(row.get("address", 0) or 0)
-    count = int(row.get("count", 1) or 1)
-    dtype = str(row.get("datatype", "int16")).lower()
-    rw = str(row.get("rw", "R")).upper()
-    end = str(row.get("endianness", "ABCD"))
-    scale = float(row.get("scale", 1.0) or 1.0)
-    value_text = "" if row.get("value") is None else str(row.get("value"))
 
-    if count <= 0:
-        count = 1
+# ----------------------------
+# Batched reads
+# ----------------------------
+
+_MAX_READ_REGS = 125   # Modbus limit for one FC03/FC04 request
+_MAX_READ_BITS = 2000  # Modbus limit for one FC01/FC02 request
+
+class _ReadOp(NamedTuple):
+    """How one kind of read is issued and unpacked when coalesced."""
+    method: str   # client method name
+    limit: int    # max items per request
+    bits: bool    # True: result in rr.bits, False: rr.registers
+
+# canonical function -> read op, for reads that can be coalesced
+_BATCH_READS = {
+    "read_holding": _ReadOp("read_holding_registers", _MAX_READ_REGS, False),
+    "read_input": _ReadOp("read_input_registers", _MAX_READ_REGS, False),
+    "read_coils": _ReadOp("read_coils", _MAX_READ_BITS, True),
+    "read_discrete": _ReadOp("read_discrete_inputs", _MAX_READ_BITS, True),
+}
+
+def _batch_key(row: Dict[str, Any]) -> Tuple[_ReadOp, int, int, int] | None:
+    # (read op, unit, address, count) for reads that may be coalesced;
+    # only normalized rows qualify (perform_rows normalizes everything it can)
+    if type(row) is not _TypedRow:
+        return None
+    op = _BATCH_READS.get(row.fn)
+    if op is None:
+        return None
+    return op, row["unit_id"], row["address"], row["count"]
+
+def _plan_batches(rows: List[Dict[str, Any]]) -> List[List[int]]:
+    """
+    Split row indices into execution groups.
+    Reads between two non-read rows are grouped by (function, unit),
+    sorted by address and merged while their ranges touch or overlap and the
+    merged span stays within one Modbus request. Everything else runs alone,
+    so writes keep their position relative to the reads around them.
+    """
+    plan: List[List[int]] = []
+    segment: Dict[Tuple[_ReadOp, int], List[Tuple[int, int, int]]] = {}
+
+    def flush() -> None:
+        runs: List[List[int]] = []
+        for (op, _), spans in segment.items():
+            limit = op.limit
+            spans.sort()
+            run: List[int] = []
+            run_start = run_end = 0
+            for start, end, i in spans:
+                if run and start <= run_end and max(run_end, end) - run_start <= limit:
+                    run.append(i)
+                    run_end = max(run_end, end)
+                else:
+                    if run:
+                        runs.append(run)
+                    run, run_start, run_end = [i], start, end
+            if run:
+                runs.append(run)
+        runs.sort(key=min)
+        plan.extend(runs)
+        segment.clear()
+
+    for i, r in enumerate(rows):
+        k = _batch_key(r)
+        if k is None:
+            flush()
+            plan.append([i])
+        else:
+            segment.setdefault(k[:2], []).append((k[2], k[2] + k[3], i))
+    flush()
+    return plan
+
+def _batch_span(keys: List[Tuple[_ReadOp, int, int, int]]) -> Tuple[_ReadOp, int, int, int]:
+    # (read op, unit, first address, end address) of one merged read
+    return keys[0][0], keys[0][1], min(k[2] for k in keys), max(k[2] + k[3] for k in keys)
+
+def _slice_batch(rows: List[Dict[str, Any]], keys: List[Tuple[_ReadOp, int, int, int]],
+                 start: int, rr) -> List[Dict[str, Any]]:
+    # Per-row results cut from one merged response, shaped like the single-row handlers'
+    out: List[Dict[str, Any]] = []
+    if keys[0][0].bits:
+        bits = rr.bits or []
+        for _, _, addr, count in keys:
+            chunk = bits[addr - start:addr - start + count]
+            out.append({"ok": True, "value": chunk[0] if len(chunk) == 1 else chunk})
+        return out
+    regs = rr.registers or []
+    for r, (_, _, addr, count) in zip(rows, keys):
+        chunk = regs[addr - start:addr - start + count]
+        val = decode_registers(chunk, r["datatype"], r["endianness"], r["scale"])
+        out.append({"ok": True, "value": val, "registers": chunk})
+    return out
+
+def _fail_all(rows: List[Dict[str, Any]], error: str) -> List[Dict[str, Any]]:
+    return [{"ok": False, "error": error} for _ in rows]
+
+def _read_batch_request(rows: List[Dict[str, Any]]):
+    # (row keys, read op, unit, first address, register/bit count) for one merged read
+    keys = [_batch_key(r) for r in rows]
+    op, unit, start, end = _batch_span(keys)
+    return keys, op, unit, start, end - start
+
+def _read_batch_results(rows: List[Dict[str, Any]], keys: List[Tuple[_ReadOp, int, int, int]],
+                        start: int, rr) -> List[Dict[str, Any]] | None:
+    # None when the device rejected the merged span: one bad address (e.g. past the end
+    # of the map) fails the whole request, so the caller re-reads the rows one by one
+    if rr.isError():
+        return None
+    try:
+        return _slice_batch(rows, keys, start, rr)
+    except _ROW_ERRORS as exc:
+        return _fail_all(rows, _exc_error(exc))
+
+def _perform_read_batch(rows: List[Dict[str, Any]], clients: Dict[Tuple[str, int, float], ModbusTcpClient],
+                        timeout: float = 3.0) -> List[Dict[str, Any]]:
+    # One read covering every row (same host, function and unit), sliced back per row.
+    keys, op, unit, start, count = _read_batch_request(rows)
+    client = _client_for(clients, rows[0].host, rows[0].port, timeout)
+    if not _connect(client):
+        return _fail_all(rows, _connect_error(rows[0]))
+    try:
+        rr = getattr(client, op.method)(start, count, unit=unit)
+    except _ROW_ERRORS as exc:
+        return _fail_all(rows, _exc_error(exc))
+    results = _read_batch_results(rows, keys, start, rr)
+    if results is None:
+        return [perform_row(r, clients, timeout=timeout) for r in rows]
+    return results
+
+def _try_normalize(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    typed: List[Dict[str, Any]] = []
+    for r in rows:
+        try:
+            typed.append(r if type(r) is _TypedRow else normalize_row(r))
+        except (TypeError, ValueError):
+            typed.append(r)  # left for perform_row to raise on, as before
+    return typed
+
+def _paced_plan(rows: List[Dict[str, Any]], min_gap: float) -> Iterator[Tuple[List[int], float]]:
+    # _plan_batches() as (row indices, seconds to wait before sending), keeping
+    # request starts on one device at least 'min_gap' apart
+    last_ts = None
+    for idxs in _plan_batches(rows):
+        wait = 0.0 if last_ts is None else last_ts + min_gap - time.monotonic()
+        last_ts = time.monotonic() + max(wait, 0.0)
+        yield idxs, wait
+
+def perform_rows(rows: List[Dict[str, Any]], clients: Dict[Tuple[str, int, float], ModbusTcpClient],
+                 timeout: float = 3.0, dry: bool = False, min_gap: float = 0.0) -> List[Dict[str, Any]]:
+    """
+    Execute rows that all target one (host, port), coalescing adjacent register
+    reads into single requests (see _plan_batches). Returns results in input order.
+    'min_gap' is the minimum spacing (seconds) between request starts.
+    """
+    rows = _try_normalize(rows)
+    results: List[Dict[str, Any]] = [{} for _ in rows]
+    for idxs, wait in _paced_plan(rows, min_gap):
+        if wait > 0:
+            time.sleep(wait)
+        if len(idxs) == 1:
+            results[idxs[0]] = perform_row(rows[idxs[0]], clients, timeout=timeout, dry=dry)
+        else:
+            for i, res in zip(idxs, _perform_read_batch([rows[i] for i in idxs], clients, timeout)):
+                results[i] = res
+    return results
+
+# ----------------------------
+# Concurrent runner (one worker per device)
+# ----------------------------
+
+# One pool for the whole process: repeated runs (daemon, web) don't respawn threads.
+_POOL_WORKERS = 32
+_pool: ThreadPoolExecutor | None = None
+_pool_lock = threading.Lock()
+
+def _device_pool() -> ThreadPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=_POOL_WORKERS, thread_name_prefix="modbus-device")
+        return _pool
+
+def _row_target(row: Dict[str, Any]) -> Tuple[str, int]:
+    # (host, port) for grouping; normalized rows carry it already
+    if type(row) is _TypedRow:
+        return row.host, row.port
+    return parse_host_port(str(row.get("ip", "")).strip() or "127.0.0.1", default_port=502)
+
+def group_rows(rows: List[Dict[str, Any]]) -> Dict[Tuple[str, int], List[int]]:
+    """
+    Group row indices by target device: {(host, port): [row indices in input order]}.
+    Each group can be handed to perform_rows(), which batches reads per device.
+    """
+    buckets: Dict[Tuple[str, int], List[int]] = {}
+    for i, r in enumerate(rows):
+        buckets.setdefault(_row_target(r), []).append(i)
+    return buckets
+
+def _close_clients(clients: Dict[Tuple[str, int, float], Any]) -> None:
+    for c in list(clients.values()):
+        try: c.close()
+        except Exception: pass
+
+def _run_device_rows(rows: List[Dict[str, Any]], timeout: float, dry: bool,
+                     min_gap: float) -> List[Dict[str, Any]]:
+    # Rows for one (host, port) run on a private client cache.
+    clients: Dict[Tuple[str, int, float], ModbusTcpClient] = {}
+    try:
+        return perform_rows(rows, clients, timeout=timeout, dry=dry, min_gap=min_gap)
+    finally:
+        _close_clients(clients)
+
+def iter_run_rows(rows: List[Dict[str, Any]], timeout: float = 3.0, dry: bool = False,
+                  min_gap: float = 0.02) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """
+    Execute mapping rows with one worker thread per distinct (host, port) and
+    yield (row index, result) pairs as each device finishes its rows.
+    Rows targeting the same device run on a single client via perform_rows;
+    different devices proceed in parallel.
+    'min_gap' is the minimum spacing (seconds) between request starts on one device.
+    """
+    buckets = group_rows(rows)
+    if not buckets:
+        return
+
+    ex = _device_pool()
+    futures = {ex.submit(_run_device_rows, [rows[i] for i in idxs], timeout, dry, min_gap): idxs
+               for idxs in buckets.values()}
+    for fut in as_completed(futures):
+        yield from zip(futures[fut], fut.result())
+
+def run_rows(rows: List[Dict[str, Any]], timeout: float = 3.0, dry: bool = False,
+             min_gap: float = 0.02) -> List[Dict[str, Any]]:
+    """
+    Like iter_run_rows(), but wait for every device and return results in input order.
+    """
+    results: List[Dict[str, Any]] = [{} for _ in rows]
+    for i, res in iter_run_rows(rows, timeout=timeout, dry=dry, min_gap=min_gap):
+        results[i] = res
+    return results
+
+
+# ----------------------------
+# Async runner (AsyncModbusTcpClient)
+# ----------------------------
+# Same handlers, planning and result shaping as above; only the client calls are awaited,
+# so requests to different devices overlap on one event loop.
+
+async def _async_client_for(clients: Dict[Tuple[str, int, float], Any],
+                            host: str, port: int, timeout: float):
+    # Cached AsyncModbusTcpClient, connected; None if the connect failed
+    from pymodbus.client import AsyncModbusTcpClient
 
     key = (host, port, float(timeout))
     client = clients.get(key)
     if client is None:
-        client = ModbusTcpClient(host=host, port=port, timeout=timeout)
+        # retries=0: one attempt per request, as with the sync client, so 'timeout'
+        # bounds a silent device per row instead of being multiplied by the retries
+        client = AsyncModbusTcpClient(host, port=port, timeout=timeout, retries=0)
         clients[key] = client
+    if not client.connected:
+        await client.connect()
+    return client if client.connected else None
 
-    if not client.connect():
-        result["error"] = f"connect failed: {host}:{port}"
+async def perform_row_async(row: Dict[str, Any], clients: Dict[Tuple[str, int, float], Any],
+                            timeout: float = 3.0, dry: bool = False) -> Dict[str, Any]:
+    """
+    Async twin of perform_row(). 'clients' caches AsyncModbusTcpClient
+    instances keyed by (host, port, timeout); callers must not run two rows
+    on the same client at once.
+    """
+    result: Dict[str, Any] = {"ok": False}
+    row, handler = _row_handler(row, result)
+    if handler is None:
+        return result
+
+    client = await _async_client_for(clients, row.host, row.port, timeout)
+    if client is None:
+        result["error"] = _connect_error(row)
         return result
 
     try:
-        # ----------- COILS -----------
-        if fn in ("read_coils", "read coil", "read_coil"):
-            rr = client.read_coils(addr, count, unit=unit)
-            if rr.isError():
-                result["error"] = str(rr)
-            else:
-                bits = list(rr.bits[:count])
-                result["ok"] = True
-                result["value"] = bits[0] if len(bits) == 1 else bits
-
-        elif fn in ("write_single", "write_single_coil", "write coil", "write_coil"):
-            bit = str(value_text).strip().lower() in ("1", "true", "on", "yes")
-            if dry:
-                result["ok"] = True
-                result["value"] = bit
-            else:
-                wr = client.write_coil(addr, bit, unit=unit)
-                result["ok"] = not wr.isError()
-                if wr.isError():
-                    result["error"] = str(wr)
-                result["value"] = bit
-
-        elif fn in ("write_multi", "write_multiple_coils", "write coils", "write_coils"):
-            bits = []
-            for p in re.split(r"[,\s;]+", str(value_text).strip()):
-                if not p:
-                    continue
-                bits.append(p.strip().lower() in ("1", "true", "on", "yes"))
-            if not bits:
-                bits = [False]
-            if dry:
-                result["ok"] = True
-                result["value"] = bits
-            else:
-                wr = client.write_coils(addr, bits, unit=unit)
-                result["ok"] = not wr.isError()
-                if wr.isError():
-                    result["error"] = str(wr)
-                result["value"] = bits
-
-        # -------- DISCRETE INPUTS --------
-        elif fn in ("read_discrete", "read_discrete_inputs", "read di", "read_discrete_input"):
-            rr = client.read_discrete_inputs(addr, count, unit=unit)
-            if rr.isError():
-                result["error"] = str(rr)
-            else:
-                bits = list(rr.bits[:count])
-                result["ok"] = True
-                result["value"] = bits[0] if len(bits) == 1 else bits
-
-        # -------- HOLDING REGISTERS --------
-        elif fn in ("read_holding", "read_holding_registers", "read hr"):
-            rr = client.read_holding_registers(addr, count, unit=unit)
-            if rr.isError():
-                result["error"] = str(rr)
-            else:
-                regs = list(rr.registers or [])[:count]
-                val = decode_registers(regs, dtype, end, scale)
-                result["ok"] = True
-                result["value"] = val
-                result["registers"] = regs
-
-        elif fn in ("write_single_register", "write_single_reg", "write single reg", "write_register"):
-            regs = build_registers(value_text, dtype, end, scale)
-            if not regs:
-                regs = [0]
-            if dry:
-                result["ok"] = True
-                result["registers"] = regs[:1]
-                result["value"] = value_text
-            else:
-                wr = client.write_register(addr, regs[0] & 0xFFFF, unit=unit)
-                result["ok"] = not wr.isError()
-                if wr.isError():
-                    result["error"] = str(wr)
-                result["registers"] = regs[:1]
-                result["value"] = value_text
-
-        elif fn in ("write_multi_registers", "write_multiple_registers", "write regs", "write_regs"):
-            regs = build_registers(value_text, dtype, end, scale)
-            if not regs:
-                regs = [0]
-            if dry:
-                result["ok"] = True
-                result["registers"] = regs
-                result["value"] = value_text
-            else:
-                wr = client.write_registers(addr, regs, unit=unit)
-                result["ok"] = not wr.isError()
-                if wr.isError():
-                    result["error"] = str(wr)
-                result["registers"] = regs
-                result["value"] = value_text
-
-        # -------- INPUT REGISTERS --------
-        elif fn in ("read_input", "read_input_registers", "read ir"):
-            rr = client.read_input_registers(addr, count, unit=unit)
-            if rr.isError():
-                result["error"] = str(rr)
-            else:
-                regs = list(rr.registers or [])[:count]
-                val = decode_registers(regs, dtype, end, scale)
-                result["ok"] = True
-                result["value"] = val
-                result["registers"] = regs
+        request = handler(row, result, dry)
+        if request is not None:
+            method, args, store = request
+            store(await getattr(client, method)(*args, unit=row["unit_id"]), result)
+    except _ROW_ERRORS as exc:
+        result["error"] = _exc_error(exc)
+
+    return result
+
+async def _perform_read_batch_async(rows: List[Dict[str, Any]], clients: Dict[Tuple[str, int, float], Any],
+                                    timeout: float = 3.0) -> List[Dict[str, Any]]:
+    # Async twin of _perform_read_batch
+    keys, op, unit, start, count = _read_batch_request(rows)
+    client = await _async_client_for(clients, rows[0].host, rows[0].port, timeout)
+    if client is None:
+        return _fail_all(rows, _connect_error(rows[0]))
+    try:
+        rr = await getattr(client, op.method)(start, count, unit=unit)
+    except _ROW_ERRORS as exc:
+        return _fail_all(rows, _exc_error(exc))
+    results = _read_batch_results(rows, keys, start, rr)
+    if results is None:
+        return [await perform_row_async(r, clients, timeout=timeout) for r in rows]
+    return results
+
+async def perform_rows_async(rows: List[Dict[str, Any]], clients: Dict[Tuple[str, int, float], Any],
+                             timeout: float = 3.0, dry: bool = False, min_gap: float = 0.0) -> List[Dict[str, Any]]:
+    """
+    Async twin of perform_rows(): rows for one (host, port), adjacent reads
+    coalesced, results in input order. 'clients' caches AsyncModbusTcpClient
+    instances; callers must not run two calls on the same device at once.
+    """
+    import asyncio
 
+    rows = _try_normalize(rows)
+    results: List[Dict[str, Any]] = [{} for _ in rows]
+    for idxs, wait in _paced_plan(rows, min_gap):
+        if wait > 0:
+            await asyncio.sleep(wait)
+        if len(idxs) == 1:
+            results[idxs[0]] = await perform_row_async(rows[idxs[0]], clients, timeout=timeout, dry=dry)
         else:
-            result["error"] = f"unsupported function: {fn}"
+            batch = await _perform_read_batch_async([rows[i] for i in idxs], clients, timeout)
+            for i, res in zip(idxs, batch):
+                results[i] = res
+    return results
 
-    except Exception as exc:
-        result["error"] = f"{type(exc).__name__}: {exc}"
+async def _run_device_rows_async(rows: List[Dict[str, Any]], timeout: float, dry: bool,
+                                 min_gap: float) -> List[Dict[str, Any]]:
+    # Rows for one (host, port) run on a private client cache.
+    clients: Dict[Tuple[str, int, float], Any] = {}
+    try:
+        return await perform_rows_async(rows, clients, timeout=timeout, dry=dry, min_gap=min_gap)
+    finally:
+        _close_clients(clients)
 
-    return result
+async def aiter_run_rows(rows: List[Dict[str, Any]], timeout: float = 3.0, dry: bool = False,
+                         min_gap: float = 0.02):
+    """
+    Event-loop counterpart of iter_run_rows(): rows are grouped by (host, port),
+    each device runs its rows in order on its own connection, and devices
+    proceed concurrently. Yields (row index, result) pairs as each device finishes.
+    """
+    import asyncio
+
+    buckets = group_rows(rows)
+
+    async def device(idxs: List[int]):
+        return idxs, await _run_device_rows_async([rows[i] for i in idxs], timeout, dry, min_gap)
+
+    for fut in asyncio.as_completed([device(idxs) for idxs in buckets.values()]):
+        idxs, res = await fut
+        for pair in zip(idxs, res):
+            yield pair
+
+async def run_rows_async(rows: List[Dict[str, Any]], timeout: float = 3.0, dry: bool = False,
+                         min_gap: float = 0.02) -> List[Dict[str, Any]]:
+    """
+    Like aiter_run_rows(), but wait for every device and return results in input order.
+    """
+    results: List[Dict[str, Any]] = [{} for _ in rows]
+    async for i, res in aiter_run_rows(rows, timeout=timeout, dry=dry, min_gap=min_gap):
+        results[i] = res
+    return results
 
 
 # ----------------------------
 # (Optional) CSV/Excel loader for CLI mode
 # ----------------------------
 
-def load_rows(path: str) -> List[Dict[str, Any]]:
+_REQUIRED_COLS = {"ip", "function", "address"}
+_MAPPING_COLS = frozenset(("device", "ip", "unit_id", "function", "address", "count", "datatype",
+                           "rw", "value", "scale", "endianness", "notes"))
+
+def _check_columns(columns) -> None:
+    missing = _REQUIRED_COLS - set(columns)
+    if missing:
+        raise SystemExit(f"Missing required columns: {', '.join(sorted(missing))}")
+
+# Mapping-row defaults, in output column order; normalize_row() coerces the values
+_RECORD_DEFAULTS = {"device": "", "ip": "", "unit_id": 1, "function": "", "address": 0, "count": 1,
+                    "datatype": "int16", "rw": "R", "value": "", "scale": 1.0, "endianness": "ABCD",
+                    "notes": ""}
+
+def _row_from_record(r) -> Dict[str, Any]:
+    rec = _RECORD_DEFAULTS.copy()
+    rec.update((k, r[k]) for k in _RECORD_DEFAULTS.keys() & r.keys())
+    return normalize_row(rec)
+
+def _typed_rows(records) -> Iterator[Dict[str, Any]]:
+    for n, r in enumerate(records, start=2):  # line/sheet row 1 is the header
+        try:
+            yield _row_from_record(r)
+        except (TypeError, ValueError) as exc:
+            raise SystemExit(f"Bad value in mapping row {n}: {exc}")
+
+def _load_rows_csv(path: str) -> Iterator[Dict[str, Any]]:
+    import csv
+
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.reader(f)
+        header = [str(c).strip().lower() for c in next(reader, [])]  # normalized once
+        _check_columns(header)
+        width = len(header)
+        pad = [""] * width
+        # Blank lines are skipped and short rows padded with "", as csv.DictReader did
+        records = (dict(zip(header, cols if len(cols) >= width else cols + pad[len(cols):]))
+                   for cols in reader if cols)
+        yield from _typed_rows(records)
+
+def _load_rows_xlsx(path: str) -> Iterator[Dict[str, Any]]:
+    # Streams the first sheet row by row (openpyxl read-only mode), no DataFrame
+    from openpyxl import load_workbook
+
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        it = wb.worksheets[0].iter_rows(values_only=True)
+        header = [str(c).strip().lower() if c is not None else "" for c in next(it, ())]
+        _check_columns(header)
+        records = (dict(zip(header, ("" if v is None else v for v in cells)))
+                   for cells in it if any(v is not None for v in cells))
+        yield from _typed_rows(records)
+    finally:
+        wb.close()
+
+def load_rows(path: str) -> Iterator[Dict[str, Any]]:
     """
     Load mapping rows from .csv or .xlsx/.xls.
     Expected headers (case-insensitive; extra fields ignored):
       device, ip, unit_id, function, address, count, datatype, rw, value, scale, endianness, notes
+    CSV files are streamed with the stdlib csv module; Excel files go through pandas,
+    or are streamed with openpyxl (.xlsx) when pandas is missing or ULSR_FAST_XLSX=1.
+    Rows come back already normalized (see normalize_row).
     """
     import os
-    import pandas as pd
 
     ext = os.path.splitext(path)[1].lower()
     if ext == ".csv":
-        df = pd.read_csv(path)
-    else:
-        df = pd.read_excel(path)
-    df.columns = [str(c).strip().lower() for c in df.columns]
+        return _load_rows_csv(path)
 
-    required = {"ip", "function", "address"}
-    missing = required - set(df.columns)
-    if missing:
-        raise SystemExit(f"Missing required columns: {', '.join(sorted(missing))}")
+    try:
+        import pandas as pd  # only Excel mappings pay for the pandas import
+    except ImportError:
+        pd = None
+    if ext in (".xlsx", ".xlsm") and (pd is None or os.environ.get("ULSR_FAST_XLSX") == "1"):
+        return _load_rows_xlsx(path)
+    if pd is None:
+        raise SystemExit("Reading .xls mappings needs pandas")
 
-    out: List[Dict[str, Any]] = []
-    for _, r in df.iterrows():
-        out.append({
-            "device": r.get("device", ""),
-            "ip": str(r.get("ip", "")).strip(),
-            "unit_id": r.get("unit_id", 1),
-            "function": r.get("function", ""),
-            "address": r.get("address", 0),
-            "count": r.get("count", 1),
-            "datatype": r.get("datatype", "int16"),
-            "rw": r.get("rw", "R"),
-            "value": r.get("value", ""),
-            "scale": r.get("scale", 1.0),
-            "endianness": r.get("endianness", "ABCD"),
-            "notes": r.get("notes", ""),
-        })
-    return out
+    def wanted(col) -> bool:
+        return str(col).strip().lower() in _MAPPING_COLS
+
+    try:  # python-calamine (Rust) is much faster than openpyxl when installed
+        df = pd.read_excel(path, engine="calamine", usecols=wanted)
+    except (ImportError, ValueError):
+        df = pd.read_excel(path, usecols=wanted)
+    df.columns = [str(c).strip().lower() for c in df.columns]
+    _check_columns(df.columns)
+    # Empty cells -> "" (so they take the normal defaults instead of becoming 'nan')
+    return _typed_rows(df.astype(object).fillna("").to_dict(orient="records"))
 
 
 # ----------------------------
 # Simple CLI (optional)
 # ----------------------------
 
+def _serve_stdin(timeout: float, dry: bool) -> None:
+    # Daemon mode: one JSON row per stdin line, one JSON result per stdout line.
+    # The client cache lives for the whole process, so connections are reused.
+    import json as _json
+    clients: Dict[Tuple[str, int, float], ModbusTcpClient] = {}
+    try:
+        for line in sys.stdin:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                row = _json.loads(line)
+            except ValueError as exc:
+                print(_json.dumps({"ok": False, "error": f"bad json: {exc}"}), flush=True)
+                continue
+            if not isinstance(row, dict):
+                print(_json.dumps({"ok": False, "error": "bad row: expected a JSON object"}), flush=True)
+                continue
+            try:
+                res = perform_row(row, clients, timeout=timeout, dry=dry)
+            except (ValueError, TypeError, KeyError) as exc:
+                # A row that doesn't normalize (e.g. address "abc") fails alone; keep serving
+                res = {"ok": False, "error": _exc_error(exc)}
+            row.update(res)
+            print(_json.dumps(row, ensure_ascii=False), flush=True)
+    finally:
+        _close_clients(clients)
+
+_OUT_BLOCK = 256  # result lines per stdout write
+
 def main():
-    import argparse, json as _json, sys, time
+    import argparse, json as _json
     p = argparse.ArgumentParser(description="Simple Modbus/TCP runner (host:port supported, payload-free)")
     p.add_argument("--file", "-f", help="CSV/XLSX mapping file")
     p.add_argument("--timeout", type=float, default=3.0)
     p.add_argument("--dry", action="store_true")
+    p.add_argument("--gap", type=float, default=0.02, help="min seconds between requests to one device")
+    p.add_argument("--daemon", action="store_true", help="read JSON rows from stdin and keep connections open")
+    p.add_argument("--sync", action="store_true", help="one thread per device instead of the asyncio client")
     args = p.parse_args()
 
+    if args.daemon:
+        _serve_stdin(args.timeout, args.dry)
+        return
+
     if not args.file:
         print("Provide --file mapping", file=sys.stderr)
         sys.exit(2)
 
-    rows = load_rows(args.file)
-    clients: Dict[Tuple[str, int, float], ModbusTcpClient] = {}
+    rows = list(load_rows(args.file))  # rows are grouped by device, so we need every row
+    # Results arrive per device as each finishes; lines are written in blocks, not one print per row
+    buf: List[str] = []
+
+    def emit(i: int, res: Dict[str, Any]) -> None:
+        # Each row is emitted once, after its device is done with it, so merge in place
+        row = rows[i]
+        row.update(res)
+        buf.append(_json.dumps(row, ensure_ascii=False) + "\n")
+        if len(buf) >= _OUT_BLOCK:
+            sys.stdout.write("".join(buf))
+            buf.clear()
+
     try:
-        for r in rows:
-            res = perform_row(r, clients, timeout=args.timeout, dry=args.dry)
-            print(_json.dumps({**r, **res}, ensure_ascii=False))
-            time.sleep(0.02)
+        if args.sync:
+            for i, res in iter_run_rows(rows, timeout=args.timeout, dry=args.dry, min_gap=args.gap):
+                emit(i, res)
+        else:
+            import asyncio
+
+            async def _amain():
+                async for i, res in aiter_run_rows(rows, timeout=args.timeout, dry=args.dry, min_gap=args.gap):
+                    emit(i, res)
+
+            asyncio.run(_amain())
     finally:
-        for c in list(clients.values()):
-            try: c.close()
-            except Exception: pass
+        sys.stdout.write("".join(buf))
+        sys.stdout.flush()
 
 if __name__ == "__main__":
     main()
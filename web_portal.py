@@ -1,13 +1,27 @@
 # web_portal.py — logo+help left header; expanded Help; static /assets + /logo.png
 from fastapi import FastAPI, HTTPException, Response, Request
-from fastapi.responses import HTMLResponse, PlainTextResponse, FileResponse
+from fastapi.responses import HTMLResponse, PlainTextResponse, FileResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.exceptions import RequestValidationError
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.staticfiles import StaticFiles
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Optional, Tuple
+from itertools import chain
 from pathlib import Path
+from pydantic import BaseModel
 from pymodbus.client import ModbusTcpClient
-from modbus_portal_cli import perform_row, parse_host_port
-import json, os, logging
+from modbus_portal_cli import RESULT_KEYS, group_rows, normalize_row, perform_rows_async, parse_host_port
+import asyncio, gzip, hashlib, json, os, logging, time
+
+try:  # optional: much faster encoder for large /run results
+    import orjson
+except ImportError:
+    orjson = None
+
+try:  # optional: ~15% smaller than gzip for the index page
+    import brotli
+except ImportError:
+    brotli = None
 
 # ---------- Paths & logging ----------
 logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
@@ -17,7 +31,15 @@ STATIC_DIR.mkdir(exist_ok=True)
 
 # ---------- App ----------
 app = FastAPI(title="Ultra-simple Modbus TCP Portal (Form Mode)")
-app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])
+# The page calls /run same-origin, so CORS is opt-in: list other front-ends (comma-separated)
+# in PORTAL_ALLOWED_ORIGINS. Preflights are cached for a day.
+_allowed_origins = [o.strip() for o in os.getenv("PORTAL_ALLOWED_ORIGINS", "").split(",") if o.strip()]
+if _allowed_origins:
+    app.add_middleware(CORSMiddleware, allow_origins=_allowed_origins, allow_methods=["GET", "POST"],
+                       allow_headers=["content-type", "accept"], max_age=86400)
+# Large /run bodies (JSON or NDJSON) repeat the same keys on every row and compress well;
+# the pre-gzipped index page passes through untouched
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
 
 try:
     app.mount("/assets", StaticFiles(directory=str(STATIC_DIR)), name="assets")
@@ -68,6 +90,73 @@ async def _diag_startup():
     logging.info(f"APP_DIR= {APP_DIR}")
     logging.info(f"STATIC_DIR= {STATIC_DIR}  exists={STATIC_DIR.exists()}  files={files}")
 
+# ---------- Shared Modbus client pool ----------
+# /run reuses TCP sessions across requests (many devices only accept 2-4 connections);
+# a background task closes clients that have sat idle longer than POOL_IDLE_S.
+POOL_IDLE_S = float(os.getenv("POOL_IDLE_S", "300"))
+POOL_REAP_S = 60.0
+
+class _ClientPool(dict):
+    # Async client cache for perform_rows_async(); get() stamps each key's last use for the reaper
+    def __init__(self):
+        super().__init__()
+        self.last_used: Dict[Tuple[str, int, float], float] = {}
+
+    def get(self, key, default=None):
+        self.last_used[key] = time.monotonic()
+        return super().get(key, default)
+
+_pool = _ClientPool()
+# One lock per (host, port): a device runs one request's plan at a time on its pooled
+# connection, so overlapping requests to it queue here while other devices run in parallel.
+_target_locks: Dict[Tuple[str, int], asyncio.Lock] = {}
+
+def _reap_pool(max_idle: float) -> None:
+    # Runs on the event loop; clients whose device is mid-run are left alone
+    now = time.monotonic()
+    for key, t in list(_pool.last_used.items()):
+        lock = _target_locks.get(key[:2])
+        if now - t <= max_idle or (lock is not None and lock.locked()):
+            continue
+        del _pool.last_used[key]
+        c = _pool.pop(key, None)
+        if c is not None:
+            try: c.close()
+            except Exception: pass
+
+async def _run_target(target: Tuple[str, int], rows: List[Dict[str, Any]],
+                      timeout: float, dry: bool) -> List[Dict[str, Any]]:
+    lock = _target_locks.setdefault(target, asyncio.Lock())
+    async with lock:
+        return await perform_rows_async(rows, _pool, timeout=timeout, dry=dry)
+
+async def _pool_reaper():
+    while True:
+        await asyncio.sleep(POOL_REAP_S)
+        _reap_pool(POOL_IDLE_S)
+
+@app.on_event("startup")
+async def _pool_startup():
+    app.state.pool_reaper = asyncio.create_task(_pool_reaper())
+
+@app.on_event("shutdown")
+async def _pool_shutdown():
+    app.state.pool_reaper.cancel()
+    _reap_pool(-1.0)
+
+# ---------- Result columns ----------
+# Results table order: the page's op fields as sent, then what the executor adds.
+# Only columns present in some row are shown; unknown keys follow in first-seen order.
+_OP_COLUMNS = ("node_name", "node_role", "device", "ip", "unit_id", "function", "address", "count",
+               "datatype", "rw", "scale", "endianness", "value", "notes")
+_RESULT_COLUMNS = _OP_COLUMNS + tuple(k for k in RESULT_KEYS if k not in _OP_COLUMNS)
+_RESULT_COLUMN_SET = frozenset(_RESULT_COLUMNS)
+
+def _result_columns(ops: List[Dict[str, Any]]) -> List[str]:
+    seen = dict.fromkeys(chain.from_iterable(ops))  # ordered key union, built in C
+    return ([c for c in _RESULT_COLUMNS if c in seen]
+            + [k for k in seen if k not in _RESULT_COLUMN_SET])
+
 # ---------- HTML ----------
 INDEX_HTML = r"""<!doctype html><html><head><meta charset="utf-8"/><meta name="viewport" content="width=device-width,initial-scale=1"/>
 <title>Team 1 High Specification Smart UPS - UL/Braeden</title>
@@ -95,6 +184,7 @@ th,td{border:1px solid #eee;padding:2px 4px;font-size:13px;vertical-align:top;wh
 th{background:#fafafa;text-align:left}
 td input{width:100%}
 .gridnum{width:5.5em}
+.gridwrap{max-height:60vh;overflow:auto}
 .ipcell{width:12em}
 .unitcell{width:4em}
 .valuecell{width:10em}
@@ -189,7 +279,7 @@ td input{width:100%}
       </label>
       <button id="coils-build">Build Table</button>
     </div>
-    <table id="coils-table"></table>
+    <div class="gridwrap"><table id="coils-table"></table></div>
   </div>
 
   <div id="tab-discrete" class="section hidden">
@@ -198,7 +288,7 @@ td input{width:100%}
       <label>Base address <input class="gridnum" id="discrete-base" type="number" min="0" value="10001"/></label>
       <button id="discrete-build">Build Table</button>
     </div>
-    <table id="discrete-table"></table>
+    <div class="gridwrap"><table id="discrete-table"></table></div>
   </div>
 
   <div id="tab-holding" class="section hidden">
@@ -217,7 +307,7 @@ td input{width:100%}
       <label>Scale <input id="holding-scale" class="gridnum" type="number" step="0.01" value="1.0"/></label>
       <button id="holding-build">Build Table</button>
     </div>
-    <table id="holding-table"></table>
+    <div class="gridwrap"><table id="holding-table"></table></div>
   </div>
 
   <div id="tab-input" class="section hidden">
@@ -229,7 +319,7 @@ td input{width:100%}
       <label>Scale <input id="input-scale" class="gridnum" type="number" step="0.01" value="1.0"/></label>
       <button id="input-build">Build Table</button>
     </div>
-    <table id="input-table"></table>
+    <div class="gridwrap"><table id="input-table"></table></div>
   </div>
 
   <div class="section">
@@ -362,55 +452,83 @@ td input{width:100%}
   document.getElementById('help-print').onclick=()=>{window.print();};
 
   // Utils
-  const escCsv=s=>'"'+String(s??'').replace(/"/g,'""')+'"';
+  // RFC 4180: only fields containing a quote, comma or line break need quoting
+  const CSV_QUOTE=/[",\r\n]/;
+  const escCsv=s=>{ s=String(s??''); return CSV_QUOTE.test(s)?'"'+s.replace(/"/g,'""')+'"':s; };
   const escHtml=s=>String(s??'').replace(/&/g,'&amp;').replace(/</g,'&lt;').replace(/>/g,'&gt;');
-
-  function buildTable(table,base,rows,includeValue,includeDatatypeNotes){
-    table.innerHTML='';
-    const thead=document.createElement('thead');
-    let head='<tr><th>#</th><th class="ipcell">IP (override)</th><th class="unitcell">Unit</th><th>Address</th>';
-    if(includeDatatypeNotes) head+='<th class="valuecell">Value (int/float or comma list)</th>';
-    else if(includeValue) head+='<th class="valuecell">Value</th>';
-    head+='<th class="notescell">Notes</th></tr>';
-    thead.innerHTML=head; table.appendChild(thead);
-    const tbody=document.createElement('tbody');
-    for(let i=0;i<rows;i++){
-      const tr=document.createElement('tr');
-      tr.innerHTML=`<td>${i+1}</td>
-        <td><input class="ipcell" placeholder="host or host:port"></td>
-        <td><input type="number" min="0" max="247" class="unitcell"></td>
-        <td><input type="number" min="0" value="${base+i}" class="gridnum"></td>
-        ${includeValue?'<td class="valuecell"><input></td>':''}
-        ${includeDatatypeNotes?(!includeValue?'<td class="valuecell"><input></td>':''):''}
-        <td class="notescell"><input placeholder="free text notes..."></td>`;
-      tbody.appendChild(tr);
+  const escAttr=s=>escHtml(s).replace(/"/g,'&quot;');
+
+  // Input grids: row state lives in a plain array (GRIDS[id].rows) kept current by one
+  // delegated listener; the tbody only holds the rows in view (all of them up to GRID_WINDOW).
+  const GRIDS={}, GRID_WINDOW=60, GRID_PAD=10;
+  function gridRowHtml(g,i){
+    const r=g.rows[i];
+    return `<tr><td>${i+1}</td>
+        <td><input class="ipcell" placeholder="host or host:port" data-i="${i}" data-f="ip" value="${escAttr(r.ip)}"></td>
+        <td><input type="number" min="0" max="247" class="unitcell" data-i="${i}" data-f="unit" value="${escAttr(r.unit)}"></td>
+        <td><input type="number" min="0" class="gridnum" data-i="${i}" data-f="addr" value="${escAttr(r.addr)}"></td>
+        ${g.hasValue?`<td class="valuecell"><input data-i="${i}" data-f="value" value="${escAttr(r.value)}"></td>`:''}
+        <td class="notescell"><input placeholder="free text notes..." data-i="${i}" data-f="notes" value="${escAttr(r.notes)}"></td></tr>`;
+  }
+  function renderGrid(g,force){
+    const n=g.rows.length, big=n>GRID_WINDOW;
+    // Row height is only measurable once the tab is visible; until then the first window is shown
+    if(big && !g.rowH && g.end>0){ g.rowH=g.tbody.rows[0].offsetHeight; force=force||g.rowH>0; }
+    const h=g.rowH||34;
+    let start=0, end=Math.min(n,GRID_WINDOW);
+    if(big && g.rowH){ start=Math.min(n-GRID_WINDOW,Math.max(0,Math.floor(g.wrap.scrollTop/h)-GRID_PAD)); end=start+GRID_WINDOW; }
+    if(!force && start===g.start && end===g.end) return;
+    g.start=start; g.end=end;
+    const parts=[];
+    if(start) parts.push(`<tr style="height:${start*h}px"></tr>`);
+    for(let i=start;i<end;i++) parts.push(gridRowHtml(g,i));
+    if(end<n) parts.push(`<tr style="height:${(n-end)*h}px"></tr>`);
+    g.tbody.innerHTML=parts.join('');
+    if(big && !g.rowH && g.tbody.rows[0].offsetHeight) renderGrid(g,true);
+  }
+  // Header HTML per value-column label (null = no value column); there are only a few
+  const THEAD_HTML=new Map();
+  function theadHtml(valueHeader){
+    let h=THEAD_HTML.get(valueHeader);
+    if(h===undefined){
+      h='<tr><th>#</th><th class="ipcell">IP (override)</th><th class="unitcell">Unit</th><th>Address</th>'
+        +(valueHeader===null?'':'<th class="valuecell">'+escHtml(valueHeader)+'</th>')+'<th class="notescell">Notes</th></tr>';
+      THEAD_HTML.set(valueHeader,h);
+    }
+    return h;
+  }
+  function buildTable(table,base,rows,valueHeader){
+    let g=GRIDS[table.id];
+    if(!g){
+      g=GRIDS[table.id]={wrap:table.parentElement,tbody:null,rows:[],rowH:0,start:-1,end:-1,hasValue:false};
+      g.wrap.addEventListener('scroll',()=>renderGrid(g),{passive:true});
+      table.addEventListener('input',e=>{const t=e.target; if(t.dataset.i!==undefined) g.rows[+t.dataset.i][t.dataset.f]=t.value;});
     }
-    table.appendChild(tbody);
+    table.innerHTML='<thead>'+theadHtml(valueHeader)+'</thead><tbody></tbody>';
+    g.tbody=table.tBodies[0];
+    g.hasValue=valueHeader!==null;
+    g.rows=Array.from({length:rows},(_,i)=>({ip:'',unit:'',addr:String(base+i),value:'',notes:''}));
+    g.start=g.end=-1; g.wrap.scrollTop=0;
+    renderGrid(g,true);
   }
 
   // Builders
-  const coilsBuild=()=>{const inc=document.getElementById('coils-mode').value!=='read_coils';buildTable(document.getElementById('coils-table'),Number(document.getElementById('coils-base').value),Number(document.getElementById('coils-rows').value),inc,false);};
-  const discreteBuild=()=>{buildTable(document.getElementById('discrete-table'),Number(document.getElementById('discrete-base').value),Number(document.getElementById('discrete-rows').value),false,false);};
-  const holdingBuild=()=>{const inc=document.getElementById('holding-mode').value!=='read_holding';buildTable(document.getElementById('holding-table'),Number(document.getElementById('holding-base').value),Number(document.getElementById('holding-rows').value),inc,true);};
-  const inputBuild=()=>{buildTable(document.getElementById('input-table'),Number(document.getElementById('input-base').value),Number(document.getElementById('input-rows').value),false,true);};
-  document.getElementById('coils-build').onclick=coilsBuild;
-  document.getElementById('discrete-build').onclick=discreteBuild;
-  document.getElementById('holding-build').onclick=holdingBuild;
-  document.getElementById('input-build').onclick=inputBuild;
-  coilsBuild();discreteBuild();holdingBuild();inputBuild();
-
-  // Gather rows
+  const NUM_VALUE='Value (int/float or comma list)';
+  // Per tab: value-column label (null = none); coils only take values in a write mode
+  const TABS=[
+    {key:'coils', valueHeader:()=>document.getElementById('coils-mode').value!=='read_coils'?'Value':null},
+    {key:'discrete', valueHeader:()=>null},
+    {key:'holding', valueHeader:()=>NUM_VALUE},
+    {key:'input', valueHeader:()=>NUM_VALUE},
+  ];
+  const tabBuild=t=>buildTable(document.getElementById(t.key+'-table'),Number(document.getElementById(t.key+'-base').value),Number(document.getElementById(t.key+'-rows').value),t.valueHeader());
+  for(const t of TABS){ document.getElementById(t.key+'-build').onclick=()=>tabBuild(t); tabBuild(t); }
+
+  // Gather rows (from the grid model, not the DOM)
   function rowsFromTable(tableEl){
-    const rows=[]; tableEl.querySelectorAll('tbody tr').forEach(tr=>{
-      const tds=tr.querySelectorAll('td');
-      const ip=tds[1].querySelector('input')?.value??'';
-      const unit=tds[2].querySelector('input')?.value??'';
-      const addr=tds[3].querySelector('input')?.value??'';
-      let idx=4, value='';
-      if(tds[idx]&&tds[idx].querySelector('input')){value=tds[idx].querySelector('input').value; idx++;}
-      const notes=(tds[idx]&&tds[idx].querySelector('input'))?tds[idx].querySelector('input').value:'';
-      rows.push({ip:ip.trim(),unit_id:unit===''?'':Number(unit),address:addr===''?'':Number(addr),value:value??'',notes});
-    }); return rows;
+    // Rows without an address are blank template rows: drop them before building op fields
+    const g=GRIDS[tableEl.id];
+    return g.rows.filter(r=>r.addr!=='').map(r=>({ip:r.ip.trim(),unit_id:r.unit===''?'':Number(r.unit),address:Number(r.addr),value:g.hasValue?r.value:'',notes:r.notes}));
   }
 
   // Address normalization
@@ -488,15 +606,13 @@ td input{width:100%}
 
     const coilsMode=document.getElementById('coils-mode').value;
     rowsFromTable(document.getElementById('coils-table')).forEach(r=>{
-      if(r.address==='')return;
       const addr0=refToZeroBased('coils',r.address);
       const isW=(coilsMode!=='read_coils'); if((which==='read'&&isW)||(which==='write'&&!isW))return;
       const raw=r.ip||def_ip; const ip=normalizeHostPort(raw, def_port); const unit=(r.unit_id===''?def_unit:r.unit_id);
       ops.push({node_name:nodeName,node_role:nodeRole,device:"COILS",ip,unit_id:unit,function:coilsMode,address:addr0,count:1,datatype:"bool",rw:isW?"W":"R",scale:1.0,endianness:"",value:isW?(coilsMode==='write_single'?(r.value||'0').trim():(r.value||'').trim()):"",notes:r.notes||""});
     });
 
-    rowsFromTable(document.getElementById('discrete-table')).forEach(r=>{
-      if(r.address===''||which==='write')return;
+    if(which!=='write') rowsFromTable(document.getElementById('discrete-table')).forEach(r=>{
       const addr0=refToZeroBased('discrete',r.address);
       const raw=r.ip||def_ip; const ip=normalizeHostPort(raw, def_port); const unit=(r.unit_id===''?def_unit:r.unit_id);
       ops.push({node_name:nodeName,node_role:nodeRole,device:"DISCRETE",ip,unit_id:unit,function:"read_discrete",address:addr0,count:1,datatype:"bool",rw:"R",scale:1.0,endianness:"",value:"",notes:r.notes||""});
@@ -505,7 +621,6 @@ td input{width:100%}
     const hMode=document.getElementById('holding-mode').value, hDT=document.getElementById('holding-dt').value, hEnd=document.getElementById('holding-endian').value, hScale=Number(document.getElementById('holding-scale').value);
     const hCount=(hDT==="int32"||hDT==="float32")?2:1; const hW=(hMode!=="read_holding");
     rowsFromTable(document.getElementById('holding-table')).forEach(r=>{
-      if(r.address==='')return;
       if((which==='read'&&hW)||(which==='write'&&!hW))return;
       const addr0=refToZeroBased('holding',r.address);
       const raw=r.ip||def_ip; const ip=normalizeHostPort(raw, def_port); const unit=(r.unit_id===''?def_unit:r.unit_id);
@@ -514,8 +629,7 @@ td input{width:100%}
 
     const iDT=document.getElementById('input-dt').value, iEnd=document.getElementById('input-endian').value, iScale=Number(document.getElementById('input-scale').value);
     const iCount=(iDT==="int32"||iDT==="float32")?2:1;
-    rowsFromTable(document.getElementById('input-table')).forEach(r=>{
-      if(r.address===''||which==='write')return;
+    if(which!=='write') rowsFromTable(document.getElementById('input-table')).forEach(r=>{
       const addr0=refToZeroBased('input',r.address);
       const raw=r.ip||def_ip; const ip=normalizeHostPort(raw, def_port); const unit=(r.unit_id===''?def_unit:r.unit_id);
       ops.push({node_name:nodeName,node_role:nodeRole,device:"INPUT",ip,unit_id:unit,function:"read_input",address:addr0,count:iCount,datatype:iDT,rw:"R",scale:iScale,endianness:iEnd,value:"",notes:r.notes||""});
@@ -524,21 +638,73 @@ td input{width:100%}
     return {ops:ops, timeout:tmo, dry:isDry, node:{name:nodeName, role:nodeRole}};
   }
 
-  function renderResults(columns,rows){
+  const cellText=v=>(typeof v==='object')?JSON.stringify(v):(v??'');
+  function resultRow(r,columns){
+    // Built as nodes with textContent, so values need no HTML escaping
+    const tr=document.createElement('tr');
+    for(const c of columns){
+      const td=document.createElement('td'), v=r[c]; td.textContent=cellText(v);
+      if(c.toLowerCase()==='ok') td.className=v?'ok':'err';
+      tr.appendChild(td);
+    }
+    return tr;
+  }
+  function renderTable(columns,n){
+    // Results skeleton; returns the empty tbody for rows to be appended to
     const div=document.getElementById('results'); div.style.display='block';
-    let html='<h3>Results</h3><div class="muted">Rows: '+rows.length+'</div><div style="max-height:60vh;overflow:auto"><table><thead><tr>'+columns.map(c=>'<th>'+escHtml(c)+'</th>').join('')+'</tr></thead><tbody>';
-    for(const r of rows){ html+='<tr>'+columns.map(c=>{const v=r[c];const cls=(c.toLowerCase()==='ok')?(v?'ok':'err'):'';const t=(typeof v==='object')?escHtml(JSON.stringify(v)):escHtml(v);return '<td class="'+cls+'">'+t+'</td>';}).join('')+'</tr>'; }
-    html+='</tbody></table></div>'; div.innerHTML=html;
-    const hdr=columns.map(escCsv).join(','), body=rows.map(row=>columns.map(c=>escCsv(typeof row[c]==='object'?JSON.stringify(row[c]):(row[c]??''))).join(',')).join('\n');
-    const blob=new Blob([hdr+'\n'+body],{type:'text/csv'}), url=URL.createObjectURL(blob); const a=document.getElementById('download'); a.href=url; a.style.display='inline-block';
+    div.innerHTML='<h3>Results</h3><div class="muted" id="res-count">Rows: '+n+'</div><div style="max-height:60vh;overflow:auto"><table><thead><tr>'+columns.map(c=>'<th>'+escHtml(c)+'</th>').join('')+'</tr></thead><tbody></tbody></table></div>';
+    return div.querySelector('tbody');
+  }
+  function renderResults(columns,rows){
+    // One pass over the rows fills an off-DOM fragment and the CSV parts; the Blob takes
+    // the parts as-is (it encodes them itself), so the CSV is never joined into one string
+    const tbody=renderTable(columns,rows.length), frag=document.createDocumentFragment(), parts=[columns.map(escCsv).join(',')];
+    for(const r of rows){ frag.appendChild(resultRow(r,columns)); parts.push('\n'+columns.map(c=>escCsv(cellText(r[c]))).join(',')); }
+    tbody.appendChild(frag);
+    // The link holds the only reference to the previous run's CSV: release it before replacing
+    const a=document.getElementById('download'); if(a.href.startsWith('blob:')) URL.revokeObjectURL(a.href);
+    a.href=URL.createObjectURL(new Blob(parts,{type:'text/csv'})); a.style.display='inline-block';
+  }
+  // /run streams NDJSON: one row per line as each device finishes, then {_columns,_order}
+  async function readNdjson(resp,onObj){
+    const reader=resp.body.getReader(), dec=new TextDecoder(); let buf='';
+    for(;;){
+      const {value,done}=await reader.read(); if(done) break;
+      buf+=dec.decode(value,{stream:true});
+      let nl; while((nl=buf.indexOf('\n'))>=0){ const line=buf.slice(0,nl); buf=buf.slice(nl+1); if(line.trim()) onObj(JSON.parse(line)); }
+    }
+    if(buf.trim()) onObj(JSON.parse(buf));
+  }
+  // The server's column order (_RESULT_COLUMNS, filled in when the page is encoded), so the
+  // streamed table starts with the columns the final sentinel will confirm
+  const RESULT_COLUMNS=__RESULT_COLUMNS__, RESULT_COLUMN_SET=new Set(RESULT_COLUMNS);
+  const resultColumns=seen=>RESULT_COLUMNS.filter(c=>seen.has(c)).concat([...seen].filter(k=>!RESULT_COLUMN_SET.has(k)));
+  async function streamResults(resp){
+    // Rows are appended as they arrive (the table is rebuilt only when a new column shows up);
+    // the final sentinel restores input order and builds the CSV once
+    const rows=[], seen=new Set(); let cols=[], tbody=null, counter=null, final=null;
+    await readNdjson(resp,obj=>{
+      if(obj._columns){ final=obj; return; }
+      rows.push(obj);
+      const known=seen.size; for(const k in obj) seen.add(k);
+      if(!tbody || seen.size!==known){
+        cols=resultColumns(seen); tbody=renderTable(cols,rows.length); counter=document.getElementById('res-count');
+        const frag=document.createDocumentFragment(); for(const r of rows) frag.appendChild(resultRow(r,cols)); tbody.appendChild(frag);
+      }else{
+        tbody.appendChild(resultRow(obj,cols)); counter.textContent='Rows: '+rows.length;
+      }
+    });
+    if(!final){ renderResults(cols,rows); return; }
+    const ordered=new Array(rows.length); final._order.forEach((idx,k)=>{ordered[idx]=rows[k];});
+    renderResults(final._columns,ordered.filter(Boolean));
   }
 
   async function postOps(which){
     const payload=buildOps(which); const status=document.getElementById('status'); status.textContent=(which==='read'?'Reading ':'Writing ')+payload.ops.length+' operations...';
     try{
-      const resp=await fetch('/run',{method:'POST',headers:{'Content-Type':'application/json'},body:JSON.stringify(payload),credentials:'same-origin'});
+      const resp=await fetch('/run',{method:'POST',headers:{'Content-Type':'application/json','Accept':'application/x-ndjson'},body:JSON.stringify(payload),credentials:'same-origin'});
       if(!resp.ok){const t=await resp.text().catch(()=> ''); throw new Error('HTTP '+resp.status+' '+(t||''));}
-      const data=await resp.json(); renderResults(data.columns||[],data.rows||[]); status.textContent='Done.';
+      await streamResults(resp); status.textContent='Done.';
     }catch(err){status.textContent='Error: '+(err?.message||err);}
   }
   const read_btn=document.getElementById('read-btn'); const write_btn=document.getElementById('write-btn');
@@ -547,13 +713,37 @@ td input{width:100%}
 </script></body></html>"""
 
 # ---------- Routes ----------
+# The page is static per process: encode and compress it once, and let browsers revalidate by ETag
+_HTML_BYTES = INDEX_HTML.replace("__RESULT_COLUMNS__", json.dumps(_RESULT_COLUMNS)).encode("utf-8")
+_HTML_GZ = gzip.compress(_HTML_BYTES, 9)
+_HTML_BR = brotli.compress(_HTML_BYTES, quality=11) if brotli is not None else None
+_HTML_HASH = hashlib.md5(_HTML_BYTES).hexdigest()
+
+def _html_variant(body: bytes, etag: str, encoding: str = "") -> Tuple[bytes, Dict[str, str], Dict[str, str]]:
+    # (body, 200 headers, 304 headers); each encoding is its own representation, so
+    # it gets its own strong ETag
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=60", "Vary": "Accept-Encoding"}
+    return body, {**headers, "Content-Encoding": encoding} if encoding else headers, headers
+
+_HTML_VARIANTS = {
+    "": _html_variant(_HTML_BYTES, f'"{_HTML_HASH}"'),
+    "gzip": _html_variant(_HTML_GZ, f'"{_HTML_HASH}-gz"', "gzip"),
+}
+if _HTML_BR is not None:
+    _HTML_VARIANTS["br"] = _html_variant(_HTML_BR, f'"{_HTML_HASH}-br"', "br")
+
 @app.get("/", response_class=HTMLResponse)
-async def index():
-    return HTMLResponse(INDEX_HTML)
+async def index(request: Request):
+    accept = request.headers.get("accept-encoding", "")
+    encoding = "br" if "br" in _HTML_VARIANTS and "br" in accept else "gzip" if "gzip" in accept else ""
+    body, headers, not_modified = _HTML_VARIANTS[encoding]
+    if not_modified["ETag"] in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=not_modified)
+    return Response(body, media_type="text/html; charset=utf-8", headers=headers)
 
 @app.get("/favicon.ico")
 async def favicon():
-    return Response(status_code=204)
+    return Response(status_code=204, headers={"Cache-Control": "public, max-age=86400"})
 
 @app.get("/logo.png")
 def logo_png():
@@ -605,14 +795,76 @@ async def ping_device(req: Request):
         except Exception: pass
     return {"ok": ok, "host": host, "port": port, "timeout": timeout, "error": err}
 
+def _dumps(obj: Any) -> bytes:
+    # Serialize with orjson when available; stdlib json otherwise (or for ints orjson can't encode)
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj)
+        except TypeError:
+            pass
+    return json.dumps(obj, ensure_ascii=False, default=str).encode("utf-8")
+
+def _json_response(obj: Any) -> Response:
+    return Response(_dumps(obj), media_type="application/json")
+
+def _normalize_ops(ops: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    # Coerce every op the way the executor will, so a bad address/count/unit/scale is a
+    # 422 naming the op (same shape as pydantic's errors) before any device I/O
+    rows: List[Dict[str, Any]] = []
+    errors: List[Dict[str, Any]] = []
+    for i, op in enumerate(ops):
+        try:
+            rows.append(normalize_row(op))
+        except (TypeError, ValueError) as exc:
+            errors.append({"type": "value_error", "loc": ("body", "ops", i), "msg": str(exc), "input": op})
+    if errors:
+        raise RequestValidationError(errors)
+    return rows
+
+async def _iter_run(ops: List[Dict[str, Any]], rows: List[Dict[str, Any]], timeout: float, dry: bool):
+    # Yields (index, op) as each device finishes. Devices run concurrently on the event
+    # loop (pymodbus async client); per device, adjacent reads go out as one request
+    # (perform_rows_async). 'rows' are the normalized ops; results are merged into the
+    # request-local ops, so their fields are echoed back as sent.
+    async def device(target: Tuple[str, int], idxs: List[int]):
+        return idxs, await _run_target(target, [rows[i] for i in idxs], timeout, dry)
+
+    for fut in asyncio.as_completed([device(t, idxs) for t, idxs in group_rows(rows).items()]):
+        idxs, res = await fut
+        for i, r in zip(idxs, res):
+            ops[i].update(r)
+            yield i, ops[i]
+
+async def _stream_run(ops: List[Dict[str, Any]], rows: List[Dict[str, Any]], timeout: float, dry: bool):
+    # NDJSON body: one row per line in completion order, then a sentinel line with the
+    # columns and each streamed row's input index (to restore input order)
+    order: List[int] = []
+    async for i, row in _iter_run(ops, rows, timeout, dry):
+        order.append(i)
+        yield _dumps(row) + b"\n"
+    yield _dumps({"_columns": _result_columns(ops), "_order": order}) + b"\n"
+
+class NodeMeta(BaseModel):
+    name: Optional[str] = None
+    role: Optional[str] = None
+
+class RunPayload(BaseModel):
+    # The envelope is validated in one pydantic-core pass (bad types -> 422 before any I/O).
+    # Ops stay free-form dicts: their extra keys are echoed back, and _normalize_ops()
+    # checks the Modbus fields per op.
+    ops: List[Dict[str, Any]] = []
+    timeout: float = 3.0
+    dry: bool = False
+    node: Optional[NodeMeta] = None
+
 @app.post("/run")
-async def run_mapping(request: Request):
-    payload = await request.json()
-    timeout = float(payload.get("timeout", 3.0))
-    dry = bool(payload.get("dry", False))
-    node = payload.get("node") or {}
-    maybe_name = (node.get("name") or "").strip()
-    maybe_role = (node.get("role") or "").strip()
+async def run_mapping(payload: RunPayload, request: Request):
+    timeout, dry = payload.timeout, payload.dry
+    ops = payload.ops
+    rows = _normalize_ops(ops)
+    node = payload.node or NodeMeta()
+    maybe_name = (node.name or "").strip()
+    maybe_role = (node.role or "").strip()
     changed = False
     if maybe_name:
         app.state.node_name = maybe_name; changed = True
@@ -621,23 +873,16 @@ async def run_mapping(request: Request):
     if changed:
         _save_node_config(app.state.node_name, app.state.node_role)
 
-    ops: List[Dict[str, Any]] = payload.get("ops") or []
     if not ops:
         raise HTTPException(status_code=400, detail="No operations provided")
 
-    clients: Dict[Tuple[str, float], ModbusTcpClient] = {}
-    results: List[Dict[str, Any]] = []
-    try:
-        for op in ops:
-            res = perform_row(op, clients, timeout=timeout, dry=dry)
-            results.append({**op, **res})
-    finally:
-        for c in list(clients.values()):
-            try: c.close()
-            except Exception: pass
+    # Browsers ask for NDJSON so rows render as devices finish; other clients get one JSON body
+    if "application/x-ndjson" in request.headers.get("accept", ""):
+        return StreamingResponse(_stream_run(ops, rows, timeout, dry), media_type="application/x-ndjson")
 
-    columns = sorted({k for r in results for k in r.keys()})
-    return {"columns": columns, "rows": results}
+    async for _ in _iter_run(ops, rows, timeout, dry):
+        pass
+    return _json_response({"columns": _result_columns(ops), "rows": ops})
 
 @app.get("/debug/static")
 def debug_static():
@@ -646,3 +891,10 @@ def debug_static():
     except Exception as e:
         files = [f"<error reading dir: {e}>"]
     return {"app_dir": str(APP_DIR), "static_dir": str(STATIC_DIR), "files": files}
+
+if __name__ == "__main__":
+    # uvicorn[standard] brings uvloop + httptools; "auto" picks them up when installed.
+    # WEB_CONCURRENCY > 1 runs that many workers, each with its own client pool.
+    import uvicorn
+    uvicorn.run("web_portal:app", host="0.0.0.0", port=int(os.getenv("PORT", "8000")),
+                loop="auto", http="auto", workers=int(os.getenv("WEB_CONCURRENCY", "1")))